@@ -1,54 +1,269 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
+from flask.json.provider import JSONProvider
+from flask_caching import Cache
+from functools import lru_cache, wraps
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-import pickle
+from googleapiclient.http import HttpRequest
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import google_auth_httplib2
+import httplib2
+import httpx
+import requests
 import os
 import json
-from datetime import datetime, timedelta
+import threading
+import hmac
+import orjson
+from datetime import date, datetime, time, timedelta, timezone
+
+class OrjsonProvider(JSONProvider):
+    """Serialize responses and parse request bodies with orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Google Calendar API scope for full access
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# Calendar and timezone used for every event
+CALENDAR_ID = 'primary'
+TIMEZONE = 'America/New_York'
+EVENTS_URL = f'https://www.googleapis.com/calendar/v3/calendars/{CALENDAR_ID}/events'
+
+# Partial responses: ask Google only for the event fields our responses use
+_LIST_FIELDS = 'items(id,summary,start,end,description,location)'
+_WRITE_FIELDS = 'id,htmlLink'
+
+_AUTH_ERROR = ({'success': False, 'error': 'Invalid or missing API key'}, 401)
+
 # Get secure values from environment variables
 API_KEY = os.environ.get('API_KEY', 'dev-key-for-local-testing')
 GOOGLE_CREDENTIALS = os.environ.get('GOOGLE_CREDENTIALS')  # JSON string of credentials
 GOOGLE_TOKEN = os.environ.get('GOOGLE_TOKEN')  # JSON string of token
+_API_KEY_BYTES = API_KEY.encode()
+REDIS_URL = os.environ.get('REDIS_URL')  # Shared response cache (per-process cache if unset; single worker only)
+
+# Cache read endpoints for 60 seconds; writes clear the cache
+if REDIS_URL:
+    cache = Cache(app, config={'CACHE_TYPE': 'RedisCache', 'CACHE_REDIS_URL': REDIS_URL,
+                               'CACHE_KEY_PREFIX': 'calendar-api:', 'CACHE_DEFAULT_TIMEOUT': 60})
+else:
+    cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 60})
+
+# Read endpoints that answer If-None-Match with 304 Not Modified
+_CONDITIONAL_ENDPOINTS = frozenset({'get_events', 'search_events'})
+
+# Calendar service and credentials are built once per process and reused across requests
+_SERVICE_CACHE = {'service': None, 'creds': None}
+_SERVICE_LOCK = threading.Lock()
+
+# Credentials are refreshed in the background this long before they expire
+_REFRESH_MARGIN = timedelta(minutes=5)
+_REFRESH_RETRY_SECONDS = 60
+_REFRESH_WAKEUP = threading.Event()
+_REFRESH_THREAD = None
+
+# Pooled keep-alive session for OAuth token refreshes
+_AUTH_SESSION = requests.Session()
+_AUTH_SESSION.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20,
+                                            max_retries=Retry(total=2, backoff_factor=0.1)))
+_AUTH_REQUEST = Request(_AUTH_SESSION)
+
+# Hot-path event list/insert calls share one HTTP/2 client; streams multiplex over a single connection
+_HTTP2_CLIENT = httpx.Client(http2=True, timeout=10.0,
+                             limits=httpx.Limits(max_connections=20, max_keepalive_connections=20))
+
+# httplib2 is not thread-safe, so each worker thread keeps its own keep-alive connection
+_HTTP_LOCAL = threading.local()
 
 def require_api_key(f):
     """Decorator to require API key for endpoints"""
+    expected_key = _API_KEY_BYTES
+    
+    @wraps(f)
     def decorated_function(*args, **kwargs):
-        api_key = request.headers.get('X-API-Key')
-        if api_key != API_KEY:
-            return jsonify({'success': False, 'error': 'Invalid or missing API key'}), 401
+        # Constant-time comparison so response timing doesn't leak the key
+        api_key = request.headers.get('X-API-Key', '').encode()
+        if not hmac.compare_digest(api_key, expected_key):
+            return _AUTH_ERROR
         return f(*args, **kwargs)
-    decorated_function.__name__ = f.__name__
     return decorated_function
 
+def _is_cacheable(rv):
+    """Only cache successful responses; error paths return (response, status) tuples"""
+    return not isinstance(rv, tuple)
+
+def _format_events(events):
+    """Convert Google Calendar event resources to the API response shape"""
+    return [{
+        'id': event['id'],
+        'title': event.get('summary', 'No title'),
+        'start': (start := event['start']).get('dateTime') or start.get('date'),
+        'end': (end := event['end']).get('dateTime') or end.get('date'),
+        'description': event.get('description', ''),
+        'location': event.get('location', '')
+    } for event in events]
+
+def _parse_date(date_str):
+    """Parse a YYYY-MM-DD date (month and day may omit leading zeros) as midnight"""
+    # Fast C parser for the canonical zero-padded form; strptime handles the rest
+    # and keeps rejecting ISO variants like 20240105 or 2024-W01-1
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            return datetime.combine(date.fromisoformat(date_str), time.min)
+        except ValueError:
+            pass
+    return datetime.strptime(date_str, '%Y-%m-%d')
+
+def _authorized_http():
+    """Return this thread's authorized HTTP transport, creating it on first use"""
+    creds = _SERVICE_CACHE['creds']
+    http = getattr(_HTTP_LOCAL, 'http', None)
+    if http is None or http.credentials is not creds:
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=10))
+        _HTTP_LOCAL.http = http
+    return http
+
+def _build_request(http, *args, **kwargs):
+    """Send every Calendar API call over the calling thread's pooled transport"""
+    return HttpRequest(_authorized_http(), *args, **kwargs)
+
+class _BearerAuth(httpx.Auth):
+    """Attach the cached OAuth access token to outgoing Calendar API requests"""
+    
+    def auth_flow(self, request):
+        request.headers['Authorization'] = f"Bearer {_SERVICE_CACHE['creds'].token}"
+        yield request
+
+_BEARER_AUTH = _BearerAuth()
+
+def _call_events_api(method, params=None, body=None):
+    """Call the Calendar events REST endpoint over the shared HTTP/2 client"""
+    # Loads or refreshes the credentials the bearer token comes from
+    get_calendar_service()
+    response = _HTTP2_CLIENT.request(
+        method,
+        EVENTS_URL,
+        params={k: v for k, v in (params or {}).items() if v is not None},
+        content=orjson.dumps(body) if body is not None else None,
+        headers={'Content-Type': 'application/json'} if body is not None else None,
+        auth=_BEARER_AUTH
+    )
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
 def get_calendar_service():
-    """Authenticate and return Google Calendar service object"""
+    """Return the Google Calendar service object, memoized for the current request"""
+    service = getattr(g, 'calendar_service', None)
+    if service is None:
+        service = g.calendar_service = _cached_service()
+    return service
+
+def _cached_service():
+    """Return the process-wide Google Calendar service object, building it on first use"""
+    creds = _SERVICE_CACHE['creds']
+    if creds and creds.valid:
+        return _SERVICE_CACHE['service']
+    
+    with _SERVICE_LOCK:
+        # Another thread may have rebuilt the service while we waited for the lock
+        creds = _SERVICE_CACHE['creds']
+        if creds and creds.valid:
+            return _SERVICE_CACHE['service']
+        
+        # Expired credentials only need a refresh; the service built on them stays usable
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(_AUTH_REQUEST)
+            _start_refresh_thread()
+            return _SERVICE_CACHE['service']
+        
+        creds = _load_credentials()
+        _SERVICE_CACHE['service'] = build('calendar', 'v3', credentials=creds, cache_discovery=False,
+                                          requestBuilder=_build_request)
+        _SERVICE_CACHE['creds'] = creds
+        _start_refresh_thread()
+        return _SERVICE_CACHE['service']
+
+def _start_refresh_thread():
+    """Start the background token refresher, or wake it to reschedule for new credentials
+    (called with _SERVICE_LOCK held)"""
+    global _REFRESH_THREAD
+    if _REFRESH_THREAD is not None and _REFRESH_THREAD.is_alive():
+        _REFRESH_WAKEUP.set()
+    else:
+        _REFRESH_THREAD = threading.Thread(target=_refresh_loop, name='token-refresh', daemon=True)
+        _REFRESH_THREAD.start()
+
+def _refresh_loop():
+    """Refresh the cached credentials shortly before they expire so requests never wait on it"""
+    while True:
+        # Cleared before reading the credentials so a wakeup for newer ones is never lost
+        _REFRESH_WAKEUP.clear()
+        creds = _SERVICE_CACHE['creds']
+        if creds is None or creds.expiry is None or not creds.refresh_token:
+            return
+        
+        # google-auth keeps expiry as naive UTC
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        delay = (creds.expiry - _REFRESH_MARGIN - now).total_seconds()
+        if delay > 0:
+            _REFRESH_WAKEUP.wait(delay)
+            continue
+        
+        try:
+            with _SERVICE_LOCK:
+                # Skip if credentials were replaced or refreshed inline while we waited
+                if creds is _SERVICE_CACHE['creds'] and creds.expiry - _REFRESH_MARGIN <= now:
+                    creds.refresh(_AUTH_REQUEST)
+        except Exception as e:
+            # Requests still refresh inline if the background refresh keeps failing
+            print(f"Error refreshing token in background: {e}")
+            _REFRESH_WAKEUP.wait(_REFRESH_RETRY_SECONDS)
+
+@lru_cache(maxsize=1)
+def _parsed_token():
+    """Parse GOOGLE_TOKEN once per process"""
+    return json.loads(GOOGLE_TOKEN) if GOOGLE_TOKEN else None
+
+@lru_cache(maxsize=1)
+def _parsed_credentials():
+    """Parse GOOGLE_CREDENTIALS once per process"""
+    return json.loads(GOOGLE_CREDENTIALS) if GOOGLE_CREDENTIALS else None
+
+def _load_credentials():
+    """Load, refresh or obtain Google OAuth credentials"""
     creds = None
     
     # Try to load credentials from environment variable first (production)
     if GOOGLE_TOKEN:
         try:
-            token_data = json.loads(GOOGLE_TOKEN)
-            creds = Credentials.from_authorized_user_info(token_data, SCOPES)
+            creds = Credentials.from_authorized_user_info(_parsed_token(), SCOPES)
         except Exception as e:
             print(f"Error loading token from environment: {e}")
     
     # Fall back to local file (development)
-    elif os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
+    elif os.path.exists('token.json'):
+        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
     
     # If no valid credentials, request authorization
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+            creds.refresh(_AUTH_REQUEST)
             
             # Save refreshed token back to environment (in production this would need a database)
             if GOOGLE_TOKEN:
@@ -59,8 +274,7 @@ def get_calendar_service():
             # Load credentials from environment or file
             if GOOGLE_CREDENTIALS:
                 # Production: load from environment variable
-                credentials_data = json.loads(GOOGLE_CREDENTIALS)
-                flow = InstalledAppFlow.from_client_config(credentials_data, SCOPES)
+                flow = InstalledAppFlow.from_client_config(_parsed_credentials(), SCOPES)
             elif os.path.exists('credentials.json'):
                 # Development: load from file
                 flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
@@ -72,58 +286,59 @@ def get_calendar_service():
                 # Development: run local OAuth flow
                 creds = flow.run_local_server(port=0)
                 # Save credentials for next run (development only)
-                with open('token.pickle', 'wb') as token:
-                    pickle.dump(creds, token)
+                with open('token.json', 'w') as token:
+                    token.write(creds.to_json())
             else:
                 # Production: we need a pre-authenticated token
-                raise Exception("Production deployment requires GOOGLE_TOKEN environment variable with valid refresh token. Please authenticate locally first and convert token.pickle to GOOGLE_TOKEN environment variable.")
+                raise Exception("Production deployment requires GOOGLE_TOKEN environment variable with valid refresh token. Please authenticate locally first and set GOOGLE_TOKEN to the contents of token.json.")
     
-    return build('calendar', 'v3', credentials=creds)
+    return creds
+
+@app.after_request
+def add_conditional_headers(response):
+    """Tag read responses with an ETag so polling clients can revalidate with If-None-Match"""
+    if request.endpoint in _CONDITIONAL_ENDPOINTS and response.status_code == 200:
+        response.add_etag()
+        response.make_conditional(request)
+    return response
 
 @app.route('/events', methods=['GET'])
 @require_api_key
+@cache.cached(timeout=60, query_string=True, response_filter=_is_cacheable)
 def get_events():
     """Get calendar events"""
     try:
-        service = get_calendar_service()
-        
         # Parse query parameters
-        date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+        date_str = request.args.get('date')
         days = int(request.args.get('days', 7))
         query = request.args.get('query', '')
         
-        # Calculate time range
-        start_date = datetime.strptime(date_str, '%Y-%m-%d')
+        # Calculate time range (defaults to the start of today)
+        if date_str:
+            start_date = _parse_date(date_str)
+        else:
+            start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         end_date = start_date + timedelta(days=days)
         
         # Format for Google Calendar API
-        time_min = start_date.isoformat() + 'Z'
-        time_max = end_date.isoformat() + 'Z'
+        time_min = start_date.isoformat(timespec='seconds') + 'Z'
+        time_max = end_date.isoformat(timespec='seconds') + 'Z'
         
         # Call Google Calendar API
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            maxResults=50,
-            singleEvents=True,
-            orderBy='startTime',
-            q=query if query else None
-        ).execute()
+        events_result = _call_events_api('GET', params={
+            'timeMin': time_min,
+            'timeMax': time_max,
+            'maxResults': 50,
+            'singleEvents': True,
+            'orderBy': 'startTime',
+            'q': query if query else None,
+            'fields': _LIST_FIELDS
+        })
         
         events = events_result.get('items', [])
         
         # Format response
-        formatted_events = []
-        for event in events:
-            formatted_events.append({
-                'id': event['id'],
-                'title': event.get('summary', 'No title'),
-                'start': event['start'].get('dateTime', event['start'].get('date')),
-                'end': event['end'].get('dateTime', event['end'].get('date')),
-                'description': event.get('description', ''),
-                'location': event.get('location', '')
-            })
+        formatted_events = _format_events(events)
         
         return jsonify({
             'success': True,
@@ -139,7 +354,6 @@ def get_events():
 def create_event():
     """Create a new calendar event"""
     try:
-        service = get_calendar_service()
         data = request.json
         
         # Build event object
@@ -154,15 +368,16 @@ def create_event():
             # Specific date and time
             start_datetime = f"{data['date']}T{data['time']}:00"
             end_datetime = f"{data['date']}T{data.get('end_time', data['time'])}:00"
-            event['start'] = {'dateTime': start_datetime, 'timeZone': 'America/New_York'}
-            event['end'] = {'dateTime': end_datetime, 'timeZone': 'America/New_York'}
+            event['start'] = {'dateTime': start_datetime, 'timeZone': TIMEZONE}
+            event['end'] = {'dateTime': end_datetime, 'timeZone': TIMEZONE}
         elif 'date' in data:
             # All-day event
             event['start'] = {'date': data['date']}
             event['end'] = {'date': data['date']}
         
         # Create event
-        created_event = service.events().insert(calendarId='primary', body=event).execute()
+        created_event = _call_events_api('POST', params={'fields': _WRITE_FIELDS}, body=event)
+        cache.clear()
         
         return jsonify({
             'success': True,
@@ -182,8 +397,10 @@ def update_event(event_id):
         service = get_calendar_service()
         data = request.json
         
+        events_api = service.events()
+        
         # Get existing event
-        event = service.events().get(calendarId='primary', eventId=event_id).execute()
+        event = events_api.get(calendarId=CALENDAR_ID, eventId=event_id).execute()
         
         # Update fields
         if 'title' in data:
@@ -197,15 +414,17 @@ def update_event(event_id):
         if 'date' in data and 'time' in data:
             start_datetime = f"{data['date']}T{data['time']}:00"
             end_datetime = f"{data['date']}T{data.get('end_time', data['time'])}:00"
-            event['start'] = {'dateTime': start_datetime, 'timeZone': 'America/New_York'}
-            event['end'] = {'dateTime': end_datetime, 'timeZone': 'America/New_York'}
+            event['start'] = {'dateTime': start_datetime, 'timeZone': TIMEZONE}
+            event['end'] = {'dateTime': end_datetime, 'timeZone': TIMEZONE}
         
         # Update event
-        updated_event = service.events().update(
-            calendarId='primary', 
+        updated_event = events_api.update(
+            calendarId=CALENDAR_ID, 
             eventId=event_id, 
-            body=event
+            body=event,
+            fields=_WRITE_FIELDS
         ).execute()
+        cache.clear()
         
         return jsonify({
             'success': True,
@@ -223,16 +442,13 @@ def delete_event(event_id):
     try:
         service = get_calendar_service()
         
-        # Get event details before deleting (for confirmation)
-        event = service.events().get(calendarId='primary', eventId=event_id).execute()
-        event_title = event.get('summary', 'Untitled Event')
-        
         # Delete event
-        service.events().delete(calendarId='primary', eventId=event_id).execute()
+        service.events().delete(calendarId=CALENDAR_ID, eventId=event_id).execute()
+        cache.clear()
         
         return jsonify({
             'success': True,
-            'message': f"Event '{event_title}' deleted successfully"
+            'message': f"Event {event_id} deleted successfully"
         })
         
     except Exception as e:
@@ -240,37 +456,28 @@ def delete_event(event_id):
 
 @app.route('/events/search', methods=['GET'])
 @require_api_key
+@cache.cached(timeout=60, query_string=True, response_filter=_is_cacheable)
 def search_events():
     """Search for events by query"""
     try:
-        service = get_calendar_service()
         query = request.args.get('query', '')
         
         if not query:
             return jsonify({'success': False, 'error': 'Query parameter required'}), 400
         
         # Search events
-        events_result = service.events().list(
-            calendarId='primary',
-            q=query,
-            maxResults=25,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+        events_result = _call_events_api('GET', params={
+            'q': query,
+            'maxResults': 25,
+            'singleEvents': True,
+            'orderBy': 'startTime',
+            'fields': _LIST_FIELDS
+        })
         
         events = events_result.get('items', [])
         
         # Format response
-        formatted_events = []
-        for event in events:
-            formatted_events.append({
-                'id': event['id'],
-                'title': event.get('summary', 'No title'),
-                'start': event['start'].get('dateTime', event['start'].get('date')),
-                'end': event['end'].get('dateTime', event['end'].get('date')),
-                'description': event.get('description', ''),
-                'location': event.get('location', '')
-            })
+        formatted_events = _format_events(events)
         
         return jsonify({
             'success': True,
@@ -282,10 +489,20 @@ def search_events():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'calendar-api'})
+# Health check body and headers are built once; probes never touch Flask routing or serialization
+_HEALTH_BODY = orjson.dumps({'status': 'healthy', 'service': 'calendar-api'})
+_HEALTH_HEADERS = [('Content-Type', 'application/json'), ('Content-Length', str(len(_HEALTH_BODY)))]
+
+def _health_middleware(wsgi_app):
+    """WSGI middleware answering GET/HEAD /health before the Flask app runs"""
+    def middleware(environ, start_response):
+        if environ.get('PATH_INFO') == '/health' and environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            start_response('200 OK', list(_HEALTH_HEADERS))
+            return [] if environ['REQUEST_METHOD'] == 'HEAD' else [_HEALTH_BODY]
+        return wsgi_app(environ, start_response)
+    return middleware
+
+app.wsgi_app = _health_middleware(app.wsgi_app)
 
 @app.route('/robots.txt', methods=['GET'])
 def robots_txt():
@@ -293,4 +510,5 @@ def robots_txt():
     return "User-agent: *\nAllow: /", 200, {'Content-Type': 'text/plain'}
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=8000)
\ No newline at end of file
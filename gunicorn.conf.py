@@ -0,0 +1,19 @@
+"""Gunicorn settings for production: gunicorn -c gunicorn.conf.py wsgi:app"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Calendar API calls are I/O-bound, so each worker runs a pool of threads;
+# keep threads in line with the per-process HTTP connection pool size
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Writes only clear the response cache of the worker that handled them, so an
+# in-process cache would serve stale /events results from every other worker
+if workers > 1 and not os.environ.get('REDIS_URL'):
+    raise RuntimeError("REDIS_URL must be set when running more than one worker (set WEB_CONCURRENCY=1 to run without Redis)")
+
+# Heartbeat files on tmpfs so a slow disk can't stall workers
+worker_tmp_dir = '/dev/shm'